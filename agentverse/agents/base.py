@@ -1,6 +1,8 @@
+import asyncio
 import logging
+import random
 from abc import abstractmethod
-from typing import List, NamedTuple, Set, Union
+from typing import List, NamedTuple, Optional, Set, Union
 
 from pydantic import BaseModel, Field
 
@@ -18,6 +20,8 @@ class BaseAgent(BaseModel):
     role_description: str = Field(default="")
     memory: BaseMemory = Field(default_factory=ChatHistoryMemory)
     max_retry: int = Field(default=3)
+    retry_backoff_base: float = Field(default=0.5)
+    retry_backoff_cap: float = Field(default=30.0)
     receiver: Set[str] = Field(default=set({"all"}))
     async_mode: bool = Field(default=True)
 
@@ -41,6 +45,48 @@ class BaseAgent(BaseModel):
         """Add a message to the memory"""
         pass
 
+    def _retry_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff to wait before retrying `attempt`"""
+        return random.uniform(
+            0, min(self.retry_backoff_cap, self.retry_backoff_base * 2**attempt)
+        )
+
+    @classmethod
+    async def abatch_step(
+        cls,
+        agents: List["BaseAgent"],
+        env_descriptions: Union[str, List[str]] = "",
+        max_concurrency: Optional[int] = None,
+    ) -> List[Message]:
+        """Run `astep` of several agents concurrently.
+
+        At most `max_concurrency` agents query the LLM at the same time,
+        which keeps large societies under the provider's rate limit.
+        The messages are returned in the order of `agents`.
+        """
+        if isinstance(env_descriptions, str):
+            env_descriptions = [env_descriptions] * len(agents)
+        if max_concurrency is None:
+            return await asyncio.gather(
+                *[
+                    agent.astep(env_description)
+                    for agent, env_description in zip(agents, env_descriptions)
+                ]
+            )
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _astep(agent: BaseAgent, env_description: str) -> Message:
+            async with semaphore:
+                return await agent.astep(env_description)
+
+        return await asyncio.gather(
+            *[
+                _astep(agent, env_description)
+                for agent, env_description in zip(agents, env_descriptions)
+            ]
+        )
+
     def get_receiver(self) -> Set[str]:
         return self.receiver
 
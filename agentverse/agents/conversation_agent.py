@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import bdb
 from string import Template
 from typing import TYPE_CHECKING, List
 
+from agentverse.llms import BaseCompletionModel
 from agentverse.message import Message
 
 from . import agent_registry
@@ -14,54 +16,98 @@ from .base import BaseAgent
 @agent_registry.register("conversation")
 class ConversationAgent(BaseAgent):
     def step(self, env_description: str = "") -> Message:
+        return asyncio.run(self.astep(env_description))
+
+    async def astep(self, env_description: str = "") -> Message:
+        """Asynchronous version of step"""
+        await self.memory.aprune()
         prompt = self._fill_prompt_template(env_description)
 
         parsed_response = None
         for i in range(self.max_retry):
             try:
-                response = self.llm.generate_response(prompt)
+                response = await self.llm.agenerate_response(prompt)
                 parsed_response = self.output_parser.parse(response)
                 break
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, bdb.BdbQuit):
                 raise
             except Exception as e:
                 logging.error(e)
                 logging.warning("Retrying...")
+                if i < self.max_retry - 1:
+                    await asyncio.sleep(self._retry_delay(i))
                 continue
 
         if parsed_response is None:
             logging.error(f"{self.name} failed to generate valid response.")
 
-        message = Message(
-            content={"diagnose": "", "solution": [], "knowledge": ""}
-            if parsed_response is None
-            else {"diagnose": parsed_response.return_values["diagnose"], "solution": parsed_response.return_values["solution"], "knowledge": parsed_response.return_values["knowledge"]},
-            sender=self.name,
-            receiver=self.get_receiver(),
-        )
-        return message
+        return self._to_message(parsed_response)
 
-    async def astep(self, env_description: str = "") -> Message:
-        """Asynchronous version of step"""
-        prompt = self._fill_prompt_template(env_description)
+    def step_batch(self, env_descriptions: List[str]) -> List[Message]:
+        """Get the responses to several environment descriptions at once.
 
-        parsed_response = None
-        for i in range(self.max_retry):
+        For offline workloads without a latency requirement. The prompts go
+        through the batch endpoint of the LLM if it has one, and responses
+        that fail to parse are not retried. With the OpenAI chat models this
+        blocks the calling thread, polling with `time.sleep`, until the batch
+        is done, which may take up to 24 hours.
+        """
+        prompts = [
+            self._fill_prompt_template(env_description)
+            for env_description in env_descriptions
+        ]
+        responses = self.llm.generate_batch_response(prompts)
+
+        messages = []
+        for response in responses:
             try:
-                response = await self.llm.agenerate_response(prompt)
                 parsed_response = self.output_parser.parse(response)
-                break
-            except (KeyboardInterrupt, bdb.BdbQuit):
-                raise
             except Exception as e:
                 logging.error(e)
-                logging.warning("Retrying...")
-                continue
-
-        if parsed_response is None:
-            logging.error(f"{self.name} failed to generate valid response.")
-
-        message = Message(
+                logging.error(f"{self.name} failed to generate valid response.")
+                parsed_response = None
+            messages.append(self._to_message(parsed_response))
+        return messages
+
+    @classmethod
+    def step_packed(
+        cls, agents: List[ConversationAgent], env_description: str = ""
+    ) -> List[Message]:
+        """Get one step response of several agents with a single LLM request.
+
+        The agents must share the same completion model settings. Their
+        prompts are packed into one multi-prompt request and the responses
+        are routed back to the agents in order. Responses that fail to
+        parse are not retried.
+        """
+        llm = agents[0].llm
+        if not isinstance(llm, BaseCompletionModel) or any(
+            not isinstance(agent.llm, BaseCompletionModel)
+            or agent.llm.args != llm.args
+            for agent in agents
+        ):
+            raise ValueError(
+                "step_packed requires the agents to use the same completion model"
+            )
+
+        prompts = [agent._fill_prompt_template(env_description) for agent in agents]
+        responses = llm.generate_packed_response(prompts)
+
+        messages = []
+        for agent, response in zip(agents, responses):
+            try:
+                parsed_response = agent.output_parser.parse(response)
+            except Exception as e:
+                logging.error(e)
+                logging.error(f"{agent.name} failed to generate valid response.")
+                parsed_response = None
+            messages.append(agent._to_message(parsed_response))
+        return messages
+
+    def _to_message(self, parsed_response) -> Message:
+        """Build the message of this agent from a parsed response, or an
+        empty message if there is none"""
+        return Message(
             content={"diagnose": "", "solution": [], "knowledge": ""}
             if parsed_response is None
             else {"diagnose": parsed_response.return_values["diagnose"], "solution": parsed_response.return_values["solution"], "knowledge": parsed_response.return_values["knowledge"]},
@@ -69,8 +115,6 @@ class ConversationAgent(BaseAgent):
             receiver=self.get_receiver(),
         )
 
-        return message
-
     def _fill_prompt_template(self, env_description: str = "") -> str:
         """Fill the placeholders in the prompt template
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from string import Template
 from typing import TYPE_CHECKING, List
@@ -19,35 +20,13 @@ class PrisonerDilemaAgent(BaseAgent):
         environment: BaseEnvironment,
         env_description: str = "",
     ) -> Message:
-        prompt = self._fill_prompt_template(env_description)
-
-        parsed_response = None
-        for i in range(self.max_retry):
-            try:
-                response = self.llm.generate_response(prompt)
-                parsed_response = self.output_parser.parse(self, environment, response)
-                break
-            except Exception as e:
-                logging.error(e)
-                logging.warning("Retrying...")
-                continue
-
-        if parsed_response is None:
-            logging.error(f"{self.name} failed to generate valid response.")
-
-        message = Message(
-            content=""
-            if parsed_response is None
-            else parsed_response.return_values["output"],
-            sender=self.name,
-            receiver=self.get_receiver(),
-        )
-        return message
+        return asyncio.run(self.astep(environment, env_description))
 
     async def astep(
         self, environment: BaseEnvironment, env_description: str = ""
     ) -> Message:
         """Asynchronous version of step"""
+        await self.memory.aprune()
         prompt = self._fill_prompt_template(env_description)
 
         parsed_response = None
@@ -59,6 +38,8 @@ class PrisonerDilemaAgent(BaseAgent):
             except Exception as e:
                 logging.error(e)
                 logging.warning("Retrying...")
+                if i < self.max_retry - 1:
+                    await asyncio.sleep(self._retry_delay(i))
                 continue
 
         if parsed_response is None:
@@ -1,9 +1,11 @@
+import asyncio
 import logging
+from functools import partial
 from string import Template
-from typing import List, NamedTuple, Optional, Union
+from typing import Callable, ClassVar, Dict, List, NamedTuple, Optional, Set, Tuple, Union
 
 from langchain.tools import BaseTool
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from agentverse.memory import BaseMemory, ChatHistoryMemory
 from agentverse.message import Message
@@ -31,71 +33,81 @@ class ToolAgent(BaseAgent):
     tool_memory: BaseMemory = Field(default_factory=ChatHistoryMemory)
     verbose: bool = Field(default=False)
 
-    def step(self, env_description: str = "") -> Message:
-        parsed_response = None
-        tool_observation = [self.tool_memory.to_string()]
-        while True:
-            prompt = self._fill_prompt_template(env_description, tool_observation)
+    # Agents with the same tools share the rendered tool prompt
+    _tool_prompt_cache: ClassVar[Dict[Tuple, Tuple[str, str]]] = {}
 
-            for i in range(self.max_retry):
-                try:
-                    response = self.llm.generate_response(prompt)
-                    parsed_response = self.output_parser.parse(response)
-                    if isinstance(parsed_response, AgentAction):
-                        observation = self._call_tool(parsed_response)
-                        tool_observation.append(
-                            parsed_response.log.strip()
-                            + f"\nObservation: {observation.strip()}"
-                        )
-                    break
-                except BaseException as e:
-                    logging.error(e)
-                    logging.warning("Retrying...")
-                    continue
-            if parsed_response is None or isinstance(parsed_response, AgentFinish):
-                break
+    # Derived from `tools`, built on first use and dropped by `add_tool`
+    _name_to_tool: Optional[Dict[str, BaseTool]] = PrivateAttr(default=None)
+    _tool_prompt: Optional[Tuple[str, str]] = PrivateAttr(default=None)
+    # Names of the tools found to have no async implementation
+    _sync_only_tools: Set[str] = PrivateAttr(default_factory=set)
 
-        if parsed_response is None:
-            logging.error(f"{self.name} failed to generate valid response.")
-
-        self._update_tool_memory(tool_observation)
-
-        message = Message(
-            content={"diagnose": "", "solution": [], "knowledge": ""}
-            if parsed_response is None
-            else {"diagnose": parsed_response.return_values["diagnose"], "solution": parsed_response.return_values["solution"], "knowledge": parsed_response.return_values["knowledge"]},
-            sender=self.name,
-            receiver=self.get_receiver(),
-        )
-        return message
+    def step(self, env_description: str = "") -> Message:
+        return asyncio.run(self.astep(env_description))
 
     async def astep(self, env_description: str = "") -> Message:
         """Asynchronous version of step"""
         # pdb.set_trace()
         parsed_response = None
+        await self.memory.aprune()
+        await self.tool_memory.aprune()
         # Initialize the tool_observation with tool_memory
         tool_observation = [self.tool_memory.to_string()]
+        # The memory does not change during the step, read it only once
+        chat_history = self.memory.to_string(add_sender_prefix=True)
         # pdb.set_trace()
         while True:
-            prompt = self._fill_prompt_template(env_description, tool_observation)
+            prompt = self._fill_prompt_template(
+                env_description, tool_observation, chat_history
+            )
 
             for i in range(self.max_retry):
                 try:
-                    response = await self.llm.agenerate_response(prompt)
-                    parsed_response = self.output_parser.parse(response)
+                    # Stream the response and stop as soon as the tool
+                    # calls are complete, so that the model does not go on
+                    # to write made-up observations
+                    response = await self.llm.astream_response(
+                        prompt, self._make_early_stop()
+                    )
+                    parsed_response = self.output_parser.parse_partial(
+                        response.content
+                    )
+                    if parsed_response is None:
+                        parsed_response = self.output_parser.parse(response)
                     if isinstance(parsed_response, AgentAction):
-                        # If the response is an action, call the tool
-                        # and append the observation to tool_observation
-                        observation = await self._acall_tool(parsed_response)
-                        # pdb.set_trace()
-                        tool_observation.append(
-                            parsed_response.log.strip()
-                            + f"\nObservation: {observation.strip()}"
+                        parsed_response = [parsed_response]
+                    if isinstance(parsed_response, list):
+                        # If the response contains actions, call the tools
+                        # concurrently and append the observations to
+                        # tool_observation in the order they were issued
+                        observations = await asyncio.gather(
+                            *[self._acall_tool(action) for action in parsed_response],
+                            return_exceptions=True,
                         )
+                        errors = [
+                            observation
+                            for observation in observations
+                            if isinstance(observation, BaseException)
+                        ]
+                        if len(errors) == len(observations):
+                            # No call went through, retry the whole turn
+                            raise errors[0]
+                        for action, observation in zip(parsed_response, observations):
+                            if isinstance(observation, BaseException):
+                                # Keep the observations of the other calls and
+                                # show the model which call failed
+                                logging.error(observation)
+                                observation = f"Error: {observation}"
+                            tool_observation.append(
+                                action.log.strip()
+                                + f"\nObservation: {observation.strip()}"
+                            )
                     break
                 except BaseException as e:
                     logging.error(e)
                     logging.warning("Retrying...")
+                    if i < self.max_retry - 1:
+                        await asyncio.sleep(self._retry_delay(i))
                     continue
             if parsed_response is None or isinstance(parsed_response, AgentFinish):
                 break
@@ -116,22 +128,73 @@ class ToolAgent(BaseAgent):
 
         return message
 
-    def _call_tool(self, response: NamedTuple) -> str:
-        """Call a tool and return the output"""
-        name_to_tool = {tool.name: tool for tool in self.tools}
-        if response.tool not in name_to_tool:
-            raise ToolNotExistError(response.tool)
-        tool = name_to_tool[response.tool]
-        observation = tool.run(response.tool_input, verbose=self.verbose)
-        return observation
+    def _make_early_stop(self) -> Callable[[str], bool]:
+        """Build the check telling when a streamed response holds complete
+        tool calls.
+
+        Whether the output is complete can only change when a new line
+        starts, so the output is only parsed on chunks with a line break and
+        while the current line is too short to tell how it starts. Parsing on
+        every chunk would be quadratic in the length of the response.
+        """
+        checked_length = 0
+        line_start = 0
+
+        def early_stop(text: str) -> bool:
+            nonlocal checked_length, line_start
+            new_text = text[checked_length:]
+            checked_length = len(text)
+            newline = new_text.rfind("\n")
+            if newline != -1:
+                line_start = len(text) - len(new_text) + newline + 1
+            elif len(text) - line_start > len("Action Input:"):
+                return False
+            return self.output_parser.parse_partial(text) is not None
+
+        return early_stop
+
+    @property
+    def name_to_tool(self) -> Dict[str, BaseTool]:
+        if self._name_to_tool is None:
+            self._name_to_tool = {tool.name: tool for tool in self.tools}
+        return self._name_to_tool
+
+    @property
+    def tool_prompt(self) -> Tuple[str, str]:
+        """The `${tools}` and `${tool_names}` arguments of the prompt"""
+        if self._tool_prompt is None:
+            key = tuple((tool.name, tool.description) for tool in self.tools)
+            if key not in self._tool_prompt_cache:
+                tools = "\n".join([f"> {name}: {description}" for name, description in key])
+                tools = tools.replace("{{", "{").replace("}}", "}")
+                tool_names = ", ".join([name for name, _ in key])
+                self._tool_prompt_cache[key] = (tools, tool_names)
+            self._tool_prompt = self._tool_prompt_cache[key]
+        return self._tool_prompt
+
+    def add_tool(self, tool: BaseTool) -> None:
+        self.tools.append(tool)
+        self._name_to_tool = None
+        self._tool_prompt = None
+        self._sync_only_tools.discard(tool.name)
 
     async def _acall_tool(self, response: NamedTuple) -> str:
         """Call a tool and return the output"""
-        name_to_tool = {tool.name: tool for tool in self.tools}
+        name_to_tool = self.name_to_tool
         if response.tool not in name_to_tool:
             raise ToolNotExistError(response.tool)
         tool = name_to_tool[response.tool]
-        observation = await tool.arun(response.tool_input, verbose=self.verbose)
+        if tool.name not in self._sync_only_tools:
+            try:
+                return await tool.arun(response.tool_input, verbose=self.verbose)
+            except NotImplementedError:
+                self._sync_only_tools.add(tool.name)
+        # Sync-only tool, run it in the default executor so that
+        # it does not block the other tool calls
+        loop = asyncio.get_running_loop()
+        observation = await loop.run_in_executor(
+            None, partial(tool.run, response.tool_input, verbose=self.verbose)
+        )
         return observation
 
     def _update_tool_memory(self, tool_observation: List[str]):
@@ -147,7 +210,10 @@ class ToolAgent(BaseAgent):
         self.tool_memory.add_message(messages)
 
     def _fill_prompt_template(
-        self, env_description: str = "", tool_observation: List[str] = []
+        self,
+        env_description: str = "",
+        tool_observation: List[str] = [],
+        chat_history: Optional[str] = None,
     ) -> str:
         """Fill the placeholders in the prompt template
 
@@ -159,15 +225,17 @@ class ToolAgent(BaseAgent):
         - ${tools}: the list of tools and their usage
         - ${tool_names}: the list of tool names
         - ${tool_observations}: the observation of the tool in this turn
+
+        `chat_history` is read from the memory if it is not given.
         """
-        tools = "\n".join([f"> {tool.name}: {tool.description}" for tool in self.tools])
-        tools = tools.replace("{{", "{").replace("}}", "}")
-        tool_names = ", ".join([tool.name for tool in self.tools])
+        if chat_history is None:
+            chat_history = self.memory.to_string(add_sender_prefix=True)
+        tools, tool_names = self.tool_prompt
         input_arguments = {
             "agent_name": self.name,
             "env_description": env_description,
             "role_description": self.role_description,
-            "chat_history": self.memory.to_string(add_sender_prefix=True),
+            "chat_history": chat_history,
             "tools": tools,
             "tool_names": tool_names,
             "tool_observation": "\n".join(tool_observation),
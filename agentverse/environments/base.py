@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from abc import abstractmethod
-from typing import TYPE_CHECKING, Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -24,6 +24,7 @@ class BaseEnvironment(BaseModel):
         cnt_turn: Current turn number
         last_messages: Messages from last turn
         rule_params: Variables set by the rule
+        max_concurrency: Maximum number of agents stepping at the same time
     """
 
     agents: List[BaseAgent]
@@ -32,6 +33,7 @@ class BaseEnvironment(BaseModel):
     cnt_turn: int = 0
     last_messages: List[Message] = []
     rule_params: Dict = {}
+    max_concurrency: Optional[int] = None
 
     @abstractmethod
     async def step(self) -> List[Message]:
@@ -1,6 +1,5 @@
-import asyncio
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 # from agentverse.agents.agent import Agent
 from agentverse.agents.conversation_agent import BaseAgent
@@ -24,6 +23,7 @@ class BasicEnvironment(BaseEnvironment):
         cnt_turn: Current turn number
         last_messages: Messages from last turn
         rule_params: Variables set by the rule
+        max_concurrency: Maximum number of agents stepping at the same time
     """
 
     agents: List[BaseAgent]
@@ -32,6 +32,7 @@ class BasicEnvironment(BaseEnvironment):
     cnt_turn: int = 0
     last_messages: List[Message] = []
     rule_params: Dict = {}
+    max_concurrency: Optional[int] = None
 
     def __init__(self, rule, **kwargs):
         rule_config = rule
@@ -59,8 +60,10 @@ class BasicEnvironment(BaseEnvironment):
         env_descriptions = self.rule.get_env_description(self)
 
         # Generate the next message
-        messages = await asyncio.gather(
-            *[self.agents[i].astep(env_descriptions[i]) for i in agent_ids]
+        messages = await BaseAgent.abatch_step(
+            [self.agents[i] for i in agent_ids],
+            [env_descriptions[i] for i in agent_ids],
+            max_concurrency=self.max_concurrency,
         )
 
         # Some rules will select certain messages from all the messages
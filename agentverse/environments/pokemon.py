@@ -1,4 +1,3 @@
-import asyncio
 import time
 import logging
 from typing import Any, Dict, List, Optional
@@ -24,6 +23,7 @@ class PokemonEnvironment(BaseEnvironment):
         cnt_turn: Current turn number
         last_messages: Messages from last turn
         rule_params: Variables set by the rule
+        max_concurrency: Maximum number of agents stepping at the same time
     """
 
     agents: List[BaseAgent]
@@ -32,6 +32,7 @@ class PokemonEnvironment(BaseEnvironment):
     cnt_turn: int = 0
     last_messages: List[Message] = []
     rule_params: Dict = {}
+    max_concurrency: Optional[int] = None
 
     def __init__(self, rule, **kwargs):
         rule_config = rule
@@ -75,8 +76,10 @@ class PokemonEnvironment(BaseEnvironment):
         env_descriptions = self.rule.get_env_description(self, player_content)
 
         # Generate the next message
-        messages = await asyncio.gather(
-            *[self.agents[i].astep(env_descriptions[i]) for i in agent_ids]
+        messages = await BaseAgent.abatch_step(
+            [self.agents[i] for i in agent_ids],
+            [env_descriptions[i] for i in agent_ids],
+            max_concurrency=self.max_concurrency,
         )
 
         # Some rules will select certain messages from all the messages
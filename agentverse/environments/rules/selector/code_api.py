@@ -85,12 +85,12 @@ def execute_unit_tests(func_impl: str, tests: str) -> str:
         else:
             success_tests += [tests[i]]
                 
-    feedback = "Tested passed:\n\n"
-    for test in success_tests:
-        feedback += f"{test}\n\n"
-    feedback += "Tests failed:\n\n"
-    for test in failed_tests:
-        feedback += f"{test}\n\n"
+    feedback = "".join(
+        ["Tested passed:\n\n"]
+        + [f"{test}\n\n" for test in success_tests]
+        + ["Tests failed:\n\n"]
+        + [f"{test}\n\n" for test in failed_tests]
+    )
         
     return json.dumps({"is_passing": is_passing, 
             "feedback": feedback})
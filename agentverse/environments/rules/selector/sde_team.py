@@ -14,16 +14,16 @@ if TYPE_CHECKING:
     from agentverse.environments import BaseEnvironment
     
 def extract(content: str, keyword: str):
-    result = ""
+    result = []
     flag = False
     for line in content.split('\n'):
         if line.strip().startswith(keyword):
             flag = True
             continue
         if flag:
-            result += line
-            result += "\n"
-    return result
+            result.append(line)
+            result.append("\n")
+    return "".join(result)
         
     
 @SelectorRegistry.register("sde_team")
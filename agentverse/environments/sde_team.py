@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from typing import Any, Dict, List
 from icecream import ic
@@ -81,8 +80,9 @@ class SdeTeamEnvironment(BaseEnvironment):
         #     *[self.agents[i].astep(env_descriptions[i]) for i in agent_ids]
         # )   # call chatgpt api
 
-        messages = await asyncio.gather(
-            *[self.agents[i].astep("") for i in agent_ids]
+        messages = await BaseAgent.abatch_step(
+            [self.agents[i] for i in agent_ids],
+            max_concurrency=self.max_concurrency,
         )
 
         # Track the messages to get the role of the sender
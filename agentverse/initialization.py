@@ -29,6 +29,18 @@ def load_memory(memory_config: Dict):
     return memory_registry.build(memory_type, **memory_config)
 
 
+def set_session_key(memory_config: Dict, task: str, agent_name: str, suffix: str):
+    """Key a persisted memory by the task, the session and the agent it
+    belongs to, so that runs and memories sharing a database do not overwrite
+    each other"""
+    if "persist_path" in memory_config:
+        session_id = memory_config.pop("session_id", "default")
+        memory_config.setdefault(
+            "session_key", f"{task}:{session_id}:agent:{agent_name}:{suffix}"
+        )
+    return memory_config
+
+
 def load_tools(tool_config: List[Dict]):
     if len(tool_config) == 0:
         return []
@@ -81,9 +93,17 @@ def prepare_task_config(task):
     task_config["output_parser"] = parser
 
     for i, agent_configs in enumerate(task_config["agents"]):
-        agent_configs["memory"] = load_memory(agent_configs.get("memory", {}))
+        agent_configs["memory"] = load_memory(
+            set_session_key(
+                agent_configs.get("memory", {}), task, agent_configs["name"], "mem"
+            )
+        )
         if agent_configs.get("tool_memory", None) is not None:
-            agent_configs["tool_memory"] = load_memory(agent_configs["tool_memory"])
+            agent_configs["tool_memory"] = load_memory(
+                set_session_key(
+                    agent_configs["tool_memory"], task, agent_configs["name"], "tool_mem"
+                )
+            )
         llm = load_llm(agent_configs.get("llm", "text-davinci-003"))
         agent_configs["llm"] = llm
         agent_configs["tools"] = load_tools(agent_configs.get("tools", []))
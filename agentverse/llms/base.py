@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Dict
+from typing import Callable, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -27,10 +27,26 @@ class BaseLLM(BaseModel):
     def agenerate_response(self, **kwargs) -> LLMResult:
         pass
 
+    async def astream_response(
+        self, prompt: str, early_stop: Optional[Callable[[str], bool]] = None
+    ) -> LLMResult:
+        """Generate a response, stopping as soon as `early_stop` returns True
+        on the text received so far. LLMs without streaming support generate
+        the full response."""
+        return await self.agenerate_response(prompt)
+
+    def generate_batch_response(self, prompts: List[str]) -> List[LLMResult]:
+        """Generate the responses of several prompts without a latency
+        requirement. LLMs without a batch endpoint send one request per prompt."""
+        return [self.generate_response(prompt) for prompt in prompts]
+
 
 class BaseChatModel(BaseLLM):
     pass
 
 
 class BaseCompletionModel(BaseLLM):
-    pass
+    def generate_packed_response(self, prompts: List[str]) -> List[LLMResult]:
+        """Generate the responses of several prompts in a single request.
+        Models without multi-prompt support send one request per prompt."""
+        return [self.generate_response(prompt) for prompt in prompts]
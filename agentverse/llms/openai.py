@@ -1,6 +1,10 @@
+import functools
+import io
+import json
 import logging
 import os
-from typing import Dict, List, Optional, Union
+import time
+from typing import Callable, Dict, List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -11,11 +15,25 @@ from .base import BaseChatModel, BaseCompletionModel, BaseModelArgs
 
 try:
     import openai
+    from openai.api_resources.abstract import CreateableAPIResource
     from openai.error import OpenAIError
 except ImportError:
     is_openai_available = False
     logging.warning("openai package is not installed")
 else:
+    is_openai_available = True
+
+    class Batch(CreateableAPIResource):
+        """The Batch API, which this version of the openai package does not wrap"""
+
+        OBJECT_NAME = "batches"
+
+
+@functools.lru_cache(maxsize=1)
+def _ensure_openai() -> None:
+    """Configure the openai package from the environment on first use"""
+    if not is_openai_available:
+        return
     openai.api_key = os.environ.get("OPENAI_API_KEY")
     openai.proxy = os.environ.get("http_proxy")
     if openai.proxy is None:
@@ -24,9 +42,6 @@ else:
         logging.warning(
             "OpenAI API key is not set. Please set the environment variable OPENAI_API_KEY"
         )
-        is_openai_available = False
-    else:
-        is_openai_available = True
 
 
 class OpenAIChatArgs(BaseModelArgs):
@@ -58,6 +73,7 @@ class OpenAICompletion(BaseCompletionModel):
         if len(kwargs) > 0:
             logging.warning(f"Unused arguments: {kwargs}")
         super().__init__(args=args, max_retry=max_retry)
+        _ensure_openai()
 
     def generate_response(self, prompt: str) -> LLMResult:
         response = openai.Completion.create(prompt=prompt, **self.args.dict())
@@ -77,6 +93,23 @@ class OpenAICompletion(BaseCompletionModel):
             total_tokens=response["usage"]["total_tokens"],
         )
 
+    def generate_packed_response(self, prompts: List[str]) -> List[LLMResult]:
+        response = openai.Completion.create(prompt=prompts, **self.args.dict())
+        # The choices of the i-th prompt are at index i * n ... (i + 1) * n - 1
+        choices = sorted(response["choices"], key=lambda choice: choice["index"])
+        n = self.args.n
+        # Usage is only reported for the whole request, so it is attributed
+        # to the first response to keep the totals right
+        return [
+            LLMResult(
+                content=choices[i * n]["text"],
+                send_tokens=response["usage"]["prompt_tokens"] if i == 0 else 0,
+                recv_tokens=response["usage"]["completion_tokens"] if i == 0 else 0,
+                total_tokens=response["usage"]["total_tokens"] if i == 0 else 0,
+            )
+            for i in range(len(prompts))
+        ]
+
 
 @llm_registry.register("gpt-3.5-turbo")
 @llm_registry.register("gpt-4")
@@ -92,6 +125,7 @@ class OpenAIChat(BaseChatModel):
         if len(kwargs) > 0:
             logging.warning(f"Unused arguments: {kwargs}")
         super().__init__(args=args, max_retry=max_retry)
+        _ensure_openai()
 
     def _construct_messages(self, prompt: str):
         return [{"role": "user", "content": prompt}]
@@ -125,3 +159,108 @@ class OpenAIChat(BaseChatModel):
             recv_tokens=response["usage"]["completion_tokens"],
             total_tokens=response["usage"]["total_tokens"],
         )
+
+    async def astream_response(
+        self, prompt: str, early_stop: Optional[Callable[[str], bool]] = None
+    ) -> LLMResult:
+        messages = self._construct_messages(prompt)
+        response = await openai.ChatCompletion.acreate(
+            messages=messages, stream=True, **self.args.dict()
+        )
+        content = ""
+        num_chunks = 0
+        async for chunk in response:
+            choice = chunk["choices"][0]
+            # With n > 1 the chunks of all choices are interleaved, only the
+            # first choice is used like in agenerate_response
+            if choice["index"] != 0:
+                continue
+            content += choice["delta"].get("content", "")
+            num_chunks += 1
+            if early_stop is not None and early_stop(content):
+                # Drop the rest of the generation
+                await response.aclose()
+                break
+        # Streamed responses carry no usage, each chunk is about one token
+        return LLMResult(
+            content=content,
+            send_tokens=0,
+            recv_tokens=num_chunks,
+            total_tokens=num_chunks,
+        )
+
+    def generate_batch_response(
+        self, prompts: List[str], poll_interval: float = 30.0
+    ) -> List[LLMResult]:
+        """Generate the responses through the Batch API, which costs half as
+        much as the chat endpoint but may take up to 24 hours to complete."""
+        requests = [
+            {
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"messages": self._construct_messages(prompt), **self.args.dict()},
+            }
+            for i, prompt in enumerate(prompts)
+        ]
+        input_file = openai.File.create(
+            file=io.BytesIO(
+                "\n".join([json.dumps(request) for request in requests]).encode()
+            ),
+            purpose="batch",
+            # The Batch API only accepts .jsonl input files
+            user_provided_filename="batch.jsonl",
+        )
+        batch = Batch.create(
+            input_file_id=input_file["id"],
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        while batch["status"] in [
+            "validating",
+            "in_progress",
+            "finalizing",
+            "cancelling",
+        ]:
+            time.sleep(poll_interval)
+            batch = Batch.retrieve(batch["id"])
+        if batch.get("output_file_id") is None and batch.get("error_file_id") is None:
+            raise OpenAIError(f"Batch {batch['id']} is {batch['status']}")
+
+        results = [
+            LLMResult(content="", send_tokens=0, recv_tokens=0, total_tokens=0)
+            for _ in prompts
+        ]
+        # Successful requests are in the output file, failed ones in the
+        # error file
+        lines = []
+        for file_id in [batch.get("output_file_id"), batch.get("error_file_id")]:
+            if file_id is not None:
+                lines += openai.File.download(file_id).decode().splitlines()
+        answered = set()
+        for line in lines:
+            if line.strip() == "":
+                continue
+            result = json.loads(line)
+            answered.add(result["custom_id"])
+            response = result.get("response") or {}
+            if result.get("error") is not None or response.get("status_code") != 200:
+                logging.error(
+                    f"Request {result['custom_id']} of batch {batch['id']} failed: "
+                    f"{result.get('error') or response.get('body')}"
+                )
+                continue
+            body = response["body"]
+            results[int(result["custom_id"])] = LLMResult(
+                content=body["choices"][0]["message"]["content"],
+                send_tokens=body["usage"]["prompt_tokens"],
+                recv_tokens=body["usage"]["completion_tokens"],
+                total_tokens=body["usage"]["total_tokens"],
+            )
+        for request in requests:
+            if request["custom_id"] not in answered:
+                logging.error(
+                    f"Request {request['custom_id']} of batch {batch['id']} "
+                    f"got no result, the batch is {batch['status']}"
+                )
+        return results
@@ -5,4 +5,5 @@ memory_registry = Registry(name="MemoryRegistry")
 from .base import BaseMemory
 from .chat_history import ChatHistoryMemory
 from .summary import SummaryMemory
+from .summary_buffer import SummaryBufferMemory
 from .sde_team import SdeTeamMemory
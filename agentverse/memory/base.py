@@ -18,3 +18,8 @@ class BaseMemory(BaseModel):
     @abstractmethod
     def reset(self) -> None:
         pass
+
+    async def aprune(self) -> None:
+        """Shrink the memory before it is read into a prompt.
+        Memories that are not bounded have nothing to do."""
+        pass
@@ -22,7 +22,7 @@ class ChatHistoryMemory(BaseMemory):
                 [
                     f"[{message.sender}]: {message.content}"
                     if message.sender != ""
-                    else message.content
+                    else str(message.content)
                     for message in self.messages
                 ]
             )
@@ -0,0 +1,166 @@
+import json
+import logging
+import sqlite3
+from contextlib import closing
+from string import Template
+from typing import List, Optional
+
+from pydantic import Field, PrivateAttr
+
+from agentverse.initialization import load_llm
+from agentverse.llms.base import BaseLLM
+from agentverse.message import Message
+
+from . import memory_registry
+from .chat_history import ChatHistoryMemory
+
+DEFAULT_PROMPT_TEMPLATE = """Progressively summarize the lines of conversation provided, adding onto the previous summary and returning a new summary.
+
+Current summary:
+${summary}
+
+New lines of conversation:
+${new_lines}
+
+New summary:"""
+
+
+@memory_registry.register("summary_buffer")
+class SummaryBufferMemory(ChatHistoryMemory):
+    """SummaryBufferMemory keeps the most recent messages verbatim and folds
+    the older ones into a running summary, so that the chat history in the
+    prompt stays under `max_token_limit` tokens however long the dialogue is.
+
+    The prompt template should contain the following arguments:
+    - $summary: The summary so far.
+    - $new_lines: The messages that are moved out of the buffer.
+
+    `add_message` only stores the messages. The buffer is summarized in
+    `aprune`, which the agents await before they read the memory in their
+    asynchronous step, so the summary request does not block the event loop.
+
+    If `persist_path` is set, the summary and the buffered messages are saved
+    in that SQLite database under `session_key` and restored on construction,
+    so that a restarted process does not summarize the dialogue again.
+    `reset` then goes back to the restored session instead of an empty one,
+    and `clear_persisted` deletes the saved session to start from scratch.
+    """
+
+    llm: BaseLLM
+    summary: str = Field(default="")
+    max_token_limit: int = Field(default=2000)
+    prompt_template: str = Field(default=DEFAULT_PROMPT_TEMPLATE)
+    persist_path: Optional[str] = Field(default=None)
+    session_key: str = Field(default="default")
+
+    # The state restored from `persist_path`, which `reset` goes back to
+    _restored_summary: str = PrivateAttr(default="")
+    _restored_messages: List[Message] = PrivateAttr(default_factory=list)
+
+    def __init__(self, *args, **kwargs):
+        llm_config = kwargs.pop("llm")
+        llm = load_llm(llm_config)
+        super().__init__(llm=llm, *args, **kwargs)
+        if self.persist_path is not None:
+            self._load()
+
+    def add_message(self, messages: List[Message]) -> None:
+        super().add_message(messages)
+        if self.persist_path is not None:
+            self._save()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.persist_path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS summary_buffer (key TEXT PRIMARY KEY, state TEXT)"
+        )
+        return connection
+
+    def _load(self) -> None:
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT state FROM summary_buffer WHERE key = ?", (self.session_key,)
+            ).fetchone()
+        if row is None:
+            return
+        state = json.loads(row[0])
+        self._restored_summary = state["summary"]
+        self._restored_messages = [
+            Message.parse_obj(message) for message in state["messages"]
+        ]
+        self.reset()
+
+    def _save(self) -> None:
+        state = {
+            "summary": self.summary,
+            "messages": [json.loads(message.json()) for message in self.messages],
+        }
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "REPLACE INTO summary_buffer (key, state) VALUES (?, ?)",
+                (self.session_key, json.dumps(state)),
+            )
+
+    async def aprune(self) -> None:
+        """Summarize the oldest messages until the buffer fits in the limit.
+        The latest message is always kept verbatim."""
+        num_tokens = self._estimate_tokens(super().to_string(add_sender_prefix=True))
+        num_pruned = 0
+        while (
+            num_pruned < len(self.messages) - 1 and num_tokens > self.max_token_limit
+        ):
+            num_tokens -= self._estimate_tokens(
+                self._format_message(self.messages[num_pruned]) + "\n"
+            )
+            num_pruned += 1
+        if num_pruned == 0:
+            return
+        try:
+            await self.aupdate_summary(self.messages[:num_pruned])
+        except Exception as e:
+            # Keep the messages in the buffer and try again on the next step
+            logging.error(e)
+            return
+        self.messages = self.messages[num_pruned:]
+        if self.persist_path is not None:
+            self._save()
+
+    async def aupdate_summary(self, messages: List[Message]) -> None:
+        new_lines = "\n".join([self._format_message(message) for message in messages])
+        input_arguments = {"summary": self.summary, "new_lines": new_lines}
+        prompt = Template(self.prompt_template).safe_substitute(input_arguments)
+        response = await self.llm.agenerate_response(prompt)
+        self.summary = str(response.content).strip()
+
+    @staticmethod
+    def _format_message(message: Message) -> str:
+        """Format a message the way `to_string` shows it with sender prefix"""
+        if message.sender != "":
+            return f"[{message.sender}]: {message.content}"
+        return str(message.content)
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        # Roughly 4 characters per token for English text
+        return len(text) // 4
+
+    def to_string(self, add_sender_prefix: bool = False) -> str:
+        history = super().to_string(add_sender_prefix=add_sender_prefix)
+        if self.summary == "":
+            return history
+        return f"Summary of the earlier conversation: {self.summary}\n{history}"
+
+    def reset(self) -> None:
+        self.messages = list(self._restored_messages)
+        self.summary = self._restored_summary
+
+    def clear_persisted(self) -> None:
+        """Delete the saved session and reset the memory to empty"""
+        if self.persist_path is not None:
+            with closing(self._connect()) as connection, connection:
+                connection.execute(
+                    "DELETE FROM summary_buffer WHERE key = ?", (self.session_key,)
+                )
+        self._restored_summary = ""
+        self._restored_messages = []
+        self.reset()
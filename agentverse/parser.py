@@ -1,5 +1,5 @@
 from agentverse.registry import Registry
-from typing import NamedTuple
+from typing import NamedTuple, Optional
 from abc import abstractmethod
 from agentverse.llms.base import LLMResult
 from pydantic import BaseModel
@@ -23,3 +23,8 @@ class OutputParser(BaseModel):
     @abstractmethod
     def parse(self, output: LLMResult) -> NamedTuple:
         pass
+
+    def parse_partial(self, text: str) -> Optional[NamedTuple]:
+        """Parse an incomplete, streamed output. Return the result once the
+        output is known to be complete, or None if more output is needed."""
+        return None
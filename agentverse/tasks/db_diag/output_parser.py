@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from typing import Union
+from typing import List, Optional, Union
 import json
 
 # from langchain.schema import AgentAction, AgentFinish
@@ -15,13 +15,19 @@ import pdb
 
 @output_parser_registry.register("db_diag")
 class DBDiag(OutputParser):
-    def parse(self, output: LLMResult) -> Union[AgentAction, AgentFinish]:
+    def parse(
+        self, output: LLMResult
+    ) -> Union[AgentAction, List[AgentAction], AgentFinish]:
         # pdb.set_trace()
         text = output.content
         cleaned_output = text.strip()
         cleaned_output = re.sub(r"\n+", "\n", cleaned_output)
         cleaned_output = cleaned_output.split("\n")
 
+        if len(cleaned_output) > 3 and len(cleaned_output) % 2 == 1:
+            # One thought followed by several independent tool calls
+            return self._parse_multiple_actions(text, cleaned_output)
+
         if not (
             len(cleaned_output) == 3
             and cleaned_output[0].startswith("Thought:")
@@ -63,3 +69,57 @@ class DBDiag(OutputParser):
             return AgentFinish({"output": ""}, text)
         else:
             return AgentAction(action.lower(), action_input, text)
+
+    def parse_partial(
+        self, text: str
+    ) -> Optional[Union[AgentAction, List[AgentAction]]]:
+        """Return the tool calls once the model starts a made-up Observation
+        or a new Thought after them. Any other line may still belong to the
+        action input, e.g. a pretty-printed JSON argument."""
+        lines = re.sub(r"\n+", "\n", text.lstrip()).split("\n")
+        # The last line may still be incomplete
+        complete_lines, last_line = lines[:-1], lines[-1]
+        if not last_line.startswith(("Observation", "Thought")):
+            return None
+        try:
+            parsed_response = self.parse(
+                LLMResult(
+                    content="\n".join(complete_lines),
+                    send_tokens=0,
+                    recv_tokens=0,
+                    total_tokens=0,
+                )
+            )
+        except Exception:
+            return None
+        if isinstance(parsed_response, AgentFinish):
+            return None
+        return parsed_response
+
+    def _parse_multiple_actions(
+        self, text: str, cleaned_output: List[str]
+    ) -> List[AgentAction]:
+        if not cleaned_output[0].startswith("Thought:"):
+            raise OutputParserError(text)
+        thought = cleaned_output[0]
+        actions = []
+        for i in range(1, len(cleaned_output), 2):
+            action_line, action_input_line = cleaned_output[i], cleaned_output[i + 1]
+            if not (
+                action_line.startswith("Action:")
+                and action_input_line.startswith("Action Input:")
+            ):
+                raise OutputParserError(text)
+            action = action_line[len("Action:") :].strip()
+            action_input = action_input_line[len("Action Input:") :].strip()
+            # Only tool calls can be issued together
+            if action in ["Speak", "CallOn", "RaiseHand", "Listen"]:
+                raise OutputParserError(text)
+            actions.append(
+                AgentAction(
+                    action.lower(),
+                    action_input,
+                    "\n".join([thought, action_line, action_input_line]),
+                )
+            )
+        return actions